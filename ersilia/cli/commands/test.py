@@ -28,7 +28,13 @@ def test_cmd():
     @click.option(
         "-o", "--output", "output", required=False, default=None, type=click.STRING
     )
-    def test(model, output):
+    @click.option(
+        "--skip_bash",
+        is_flag=True,
+        default=False,
+        help="Skip running the model with its run.sh script and comparing it to the Ersilia run",
+    )
+    def test(model, output, skip_bash):
         mdl = ModelTester(model)
         model_id = mdl.model_id
 
@@ -39,6 +45,6 @@ def test_cmd():
             )
             return
 
-        mt = ModelTester(model_id=model_id)
+        mt = ModelTester(model_id=model_id, enable_bash_run=not skip_bash)
         # click.echo("Checking model information")
         mt.run(output)  # pass in the output here
@@ -132,6 +132,7 @@ class DockerfileFile(object):
         self.path = os.path.abspath(path)
         self.parser = SimpleDockerfileParser(self.path)
         self.conda = SimpleConda()
+        self._runs = None
 
     def get_file(self):
         """gets the file from the specific directory"""
@@ -192,8 +193,14 @@ class DockerfileFile(object):
                 result["python"] = "py310"
         return result
 
+    def get_runs(self):
+        """Gets the RUN commands of the Dockerfile, parsing it only once."""
+        if self._runs is None:
+            self._runs = self.parser.get_runs()
+        return list(self._runs)
+
     def has_runs(self):
-        if self.parser.get_runs():
+        if self.get_runs():
             return True
         else:
             return False
@@ -208,11 +215,6 @@ class DockerfileFile(object):
                     return True
         return False
 
-    def get_install_commands_from_dockerfile(self, fn):
-        dp = SimpleDockerfileParser(fn)
-        runs = dp.get_runs()
-        return runs
-
     def get_install_commands(self):
         fn = self.get_file()
         if fn is None:
@@ -227,7 +229,7 @@ class DockerfileFile(object):
             exclusive_conda_and_pip = True
         else:
             exclusive_conda_and_pip = False
-            runs = self.get_install_commands_from_dockerfile(fn)
+            runs = self.get_runs()
         result = {
             "conda": needs_conda,
             "commands": runs,
@@ -263,6 +265,7 @@ class DockerfileFile(object):
             for r in R:
                 f.write(r)
         self.parser = SimpleDockerfileParser(self.path)
+        self._runs = None
 
     def check(self):
         return True
@@ -50,63 +50,33 @@ class ModelDockerHubFetcher(ErsiliaBase):
         di.serve()
         di.close()
 
-    def _copy_from_bentoml_image(self, model_id, file):
-        fr_file = "/root/eos/dest/{0}/{1}".format(model_id, file)
-        to_file = "{0}/dest/{1}/{2}".format(EOS, model_id, file)
-        self.simple_docker.cp_from_image(
-            img_path=fr_file,
-            local_path=to_file,
-            org=DOCKERHUB_ORG,
-            img=model_id,
-            tag=DOCKERHUB_LATEST_TAG,
-        )
-
-    def _copy_from_ersiliapack_image(self, model_id, file):
-        fr_file = "/root/{0}".format(file)
-        to_file = "{0}/dest/{1}/{2}".format(EOS, model_id, file)
-        self.simple_docker.cp_from_image(
-            img_path=fr_file,
-            local_path=to_file,
-            org=DOCKERHUB_ORG,
-            img=model_id,
-            tag=DOCKERHUB_LATEST_TAG,
-        )
-
-    def _copy_from_image_to_local(self, model_id, file):
+    def _image_dir(self, model_id):
         pack_method = resolve_pack_method_docker(model_id)
         if pack_method == PACK_METHOD_BENTOML:
-            self._copy_from_bentoml_image(model_id, file)
-        else:
-            self._copy_from_ersiliapack_image(model_id, file)
+            return "/root/eos/dest/{0}".format(model_id)
+        return "/root"
 
-    def copy_information(self, model_id):
-        self.logger.debug("Copying information file from model container")
-        self._copy_from_image_to_local(model_id, INFORMATION_FILE)
-
-    def copy_metadata(self, model_id):
-        self.logger.debug("Copying api_schema_file file from model container")
-        self._copy_from_image_to_local(model_id, API_SCHEMA_FILE)
-
-    def copy_status(self, model_id):
-        self.logger.debug("Copying status file from model container")
-        self._copy_from_image_to_local(model_id, STATUS_FILE)
-                                       
-    def copy_example_if_available(self, model_id):
-        # TODO This also needs to change to accomodate ersilia pack
-        for pf in PREDEFINED_EXAMPLE_FILES:
-            fr_file = "/root/eos/dest/{0}/{1}".format(model_id, pf)
-            to_file = "{0}/dest/{1}/{2}".format(EOS, model_id, "input.csv")
-            try:
-                self.simple_docker.cp_from_image(
-                    img_path=fr_file,
-                    local_path=to_file,
-                    org=DOCKERHUB_ORG,
-                    img=model_id,
-                    tag=DOCKERHUB_LATEST_TAG,
-                )
-                return
-            except:
-                self.logger.debug("Could not find example file in docker image")
+    def copy_files_from_image(self, model_id):
+        self.logger.debug(
+            "Copying information, api_schema_file, status and example files from model container"
+        )
+        files = [(f, f) for f in [INFORMATION_FILE, API_SCHEMA_FILE, STATUS_FILE]]
+        # TODO Example files also need to change to accomodate ersilia pack
+        example_files = [(pf, "input.csv") for pf in PREDEFINED_EXAMPLE_FILES]
+        local_dir = "{0}/dest/{1}".format(EOS, model_id)
+        with self.simple_docker.open_image(
+            DOCKERHUB_ORG, model_id, DOCKERHUB_LATEST_TAG
+        ) as img:
+            img.copy_many(
+                img_dir=self._image_dir(model_id), files=files, local_dir=local_dir
+            )
+            copied = img.copy_many(
+                img_dir="/root/eos/dest/{0}".format(model_id),
+                files=example_files,
+                local_dir=local_dir,
+            )
+        if "input.csv" not in copied:
+            self.logger.debug("Could not find example file in docker image")
 
     def modify_information(self, model_id):
         """
@@ -142,8 +112,5 @@ class ModelDockerHubFetcher(ErsiliaBase):
         mr = ModelRegisterer(model_id=model_id, config_json=self.config_json)
         mr.register(is_from_dockerhub=True)
         self.write_apis(model_id)
-        self.copy_information(model_id)
+        self.copy_files_from_image(model_id)
         self.modify_information(model_id)
-        self.copy_metadata(model_id)
-        self.copy_status(model_id)
-        self.copy_example_if_available(model_id)
@@ -6,17 +6,18 @@ import tempfile
 import time
 import click
 import types
+import numpy as np
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
-from ersilia.utils.conda import SimpleConda
+from ersilia.utils.conda import SimpleConda, BASE
 from .. import ErsiliaBase, ErsiliaModel, throw_ersilia_exception
 from ..cli import echo
 from ..core.session import Session
 from ..default import EOS, INFORMATION_FILE
 from ..io.input import ExampleGenerator
 from ..utils.exceptions_utils import test_exceptions as texc
-from ..utils.logging import make_temp_dir
 from ..utils.terminal import run_command_check_output
 
 
@@ -25,32 +26,128 @@ from ..utils.terminal import run_command_check_output
 MISSING_PACKAGES = False
 try:
     from scipy.stats import spearmanr
-    from fuzzywuzzy import fuzz
+    from rapidfuzz import fuzz
 except ImportError:
     MISSING_PACKAGES = True
 
+# orjson is optional and only used to speed up reading and writing json files
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 RUN_FILE = "run.sh"
-DATA_FILE = "data.csv"
 NUM_SAMPLES = 5
 BOLD = "\033[1m"
 RESET = "\033[0m"
 
 
+def _json_load(f):
+    if orjson is not None:
+        return orjson.loads(f.read())
+    return json.load(f)
+
+
+def _json_dump(data, f):
+    if orjson is not None:
+        f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2).decode())
+    else:
+        json.dump(data, f, indent=2)
+
+
+def _compute_rmse(y_true, y_pred):
+    n = min(len(y_true), len(y_pred))
+    y_true = np.asarray(y_true[:n], dtype=np.float64)
+    y_pred = np.asarray(y_pred[:n], dtype=np.float64)
+    return float(np.mean((y_true - y_pred) ** 2))
+
+
+def _flatten(values):
+    # Matrix and ragged (list of lists) outputs are compared on their flattened values
+    for v in values:
+        if isinstance(v, list):
+            yield from _flatten(v)
+        else:
+            yield v
+
+
+def _is_typed(value):
+    if not isinstance(value, list):
+        return True
+    return any(x is not None for x in _flatten(value))
+
+
+def _scan_files(directory):
+    # Like os.walk, unreadable directories are skipped and symlinked directories
+    # are listed but not descended into. DirEntry caches the stat result, saving
+    # one syscall per file.
+    try:
+        it = os.scandir(directory)
+    except OSError:
+        return
+    with it:
+        for entry in it:
+            if entry.is_dir():
+                if not entry.is_symlink():
+                    yield from _scan_files(entry.path)
+            else:
+                yield entry
+
+
 class ModelTester(ErsiliaBase):
-    def __init__(self, model_id, config_json=None):
+    _VALID_TASKS = frozenset(
+        {
+            "Classification",
+            "Regression",
+            "Generative",
+            "Representation",
+            "Similarity",
+            "Clustering",
+            "Dimensionality reduction",
+        }
+    )
+    _VALID_INPUTS = frozenset({("Compound",), ("Protein",), ("Text",)})
+    _VALID_INPUT_SHAPES = frozenset(
+        {"Single", "Pair", "List", "Pair of Lists", "List of Lists"}
+    )
+    _VALID_OUTPUTS = frozenset(
+        {
+            "Boolean",
+            "Compound",
+            "Descriptor",
+            "Distance",
+            "Experimental value",
+            "Image",
+            "Other value",
+            "Probability",
+            "Protein",
+            "Score",
+            "Text",
+        }
+    )
+    _VALID_OUTPUT_TYPES = frozenset({("String",), ("Float",), ("Integer",)})
+    _VALID_OUTPUT_SHAPES = frozenset(
+        {"Single", "List", "Flexible List", "Matrix", "Serializable Object"}
+    )
+
+    def __init__(self, model_id, config_json=None, enable_bash_run=True):
         ErsiliaBase.__init__(self, config_json=config_json, credentials_json=None)
         self.model_id = model_id
         self.model_size = 0
-        self.tmp_folder = make_temp_dir(prefix="ersilia-")
+        self._enable_bash_run = enable_bash_run
         self._info = self._read_information()
-        self._input = self._info["card"]["Input"]
-        self._output_type = self._info["card"]["Output Type"]
-        self.RUN_FILE = "run.sh"
+        self._card = self._info["card"]
+        self._input = self._card["Input"]
+        self._output_type = self._card["Output Type"]
         self.information_check = False
         self.single_input = False
         self.example_input = False
         self.consistent_output = False
         self.run_using_bash = False
+        self._service_class = None
+        self._mdl = None
+        self._example_gen = None
+        self._example_input = None
 
     def _read_information(self):
         json_file = os.path.join(self._dest_dir, self.model_id, INFORMATION_FILE)
@@ -58,11 +155,37 @@ class ModelTester(ErsiliaBase):
         if not os.path.exists(json_file):
             raise texc.InformationFileNotExist(self.model_id)
         with open(json_file, "r") as f:
-            data = json.load(f)
+            data = _json_load(f)
         return data
 
     """
-    This function uses the fuzzy wuzzy package to compare the differences between outputs when 
+    The session service class, the model and the example input are shared by all the checks, so they are only created once.
+    """
+
+    def _get_service_class(self):
+        if self._service_class is None:
+            session = Session(config_json=None)
+            self._service_class = session.current_service_class()
+        return self._service_class
+
+    def _get_model(self):
+        if self._mdl is None:
+            self._mdl = ErsiliaModel(
+                self.model_id, service_class=self._get_service_class(), config_json=None
+            )
+        return self._mdl
+
+    def _get_example_input(self):
+        if self._example_input is None:
+            if self._example_gen is None:
+                self._example_gen = ExampleGenerator(model_id=self.model_id)
+            self._example_input = self._example_gen.example(
+                n_samples=NUM_SAMPLES, file_name=None, simple=True, try_predefined=False
+            )
+        return self._example_input
+
+    """
+    This function uses the rapidfuzz package to compare the differences between outputs when 
     they're strings and not floats. The fuzz.ratio gives the percent of similarity between the two outputs.
     Example: two strings that are the exact same will return 100
     """
@@ -71,21 +194,21 @@ class ModelTester(ErsiliaBase):
         if output1 is None and output2 is None:
             return 100
         else:
-            return fuzz.ratio(output1, output2)
+            return round(fuzz.ratio(output1, output2))
 
-   
-   
     """
-    When the user specifies an output file, the file will show the user how big the model is. This function 
-    calculates the size of the model to allow this. 
+    Element-wise version of _compare_output_strings for list outputs. Returns the lowest similarity found.
     """
 
-    def _set_model_size(self, directory):
-        for dirpath, dirnames, filenames in os.walk(directory):
-            for filename in filenames:
-                file_path = os.path.join(dirpath, filename)
-                self.model_size += os.path.getsize(file_path)
+    def _compare_output_string_lists(self, ls1, ls2):
+        if len(ls1) != len(ls2):
+            return 0
+        return min(
+            (self._compare_output_strings(a, b) for a, b in zip(ls1, ls2)), default=100
+        )
 
+   
+   
     """
     This helper method was taken from the run.py file, and just prints the output for the user 
     """
@@ -94,18 +217,18 @@ class ModelTester(ErsiliaBase):
         echo("Printing output...")
 
         if isinstance(result, types.GeneratorType):
-            for r in result:
-                if r is not None:
-                    if output is not None:
-                        with open(output.name, "w") as file:
-                            json.dump(r, output.name)
-                    else:
+            if output is not None:
+                # One JSON object per line
+                with open(output.name, "w") as file:
+                    for r in result:
+                        if r is None:
+                            echo("Something went wrong", fg="red")
+                        json.dump(r, file)
+                        file.write("\n")
+            else:
+                for r in result:
+                    if r is not None:
                         echo(json.dumps(r, indent=4))
-                else:
-                    if output is not None:
-                        message = echo("Something went wrong", fg="red")
-                        with open(output.name, "w") as file:
-                            json.dump(message, output.name)
                     else:
                         echo("Something went wrong", fg="red")
 
@@ -116,27 +239,27 @@ class ModelTester(ErsiliaBase):
     This helper method checks that the model ID is correct.
     """
 
-    def _check_model_id(self, data):
+    def _check_model_id(self, card):
         self.logger.debug("Checking model ID...")
-        if data["card"]["Identifier"] != self.model_id:
+        if card["Identifier"] != self.model_id:
             raise texc.WrongCardIdentifierError(self.model_id)
 
     """
     This helper method checks that the slug field is non-empty.
     """
 
-    def _check_model_slug(self, data):
+    def _check_model_slug(self, card):
         self.logger.debug("Checking model slug...")
-        if not data["card"]["Slug"]:
+        if not card["Slug"]:
             raise texc.EmptyField("slug")
 
     """
     This helper method checks that the description field is non-empty.
     """
 
-    def _check_model_description(self, data):
+    def _check_model_description(self, card):
         self.logger.debug("Checking model description...")
-        if not data["card"]["Description"]:
+        if not card["Description"]:
             raise texc.EmptyField("Description")
 
     """
@@ -150,25 +273,13 @@ class ModelTester(ErsiliaBase):
         - Dimensionality reduction
     """
 
-    def _check_model_task(self, data):
+    def _check_model_task(self, card):
         self.logger.debug("Checking model task...")
-        valid_tasks = [
-            "Classification",
-            "Regression",
-            "Generative",
-            "Representation",
-            "Similarity",
-            "Clustering",
-            "Dimensionality reduction",
-        ]
-        sep = ", "
-        tasks = []
-        if sep in data["card"]["Task"]:
-            tasks = data["card"]["Task"].split(sep)
-        else:
-            tasks = data["card"]["Task"]
+        tasks = card["Task"]
+        if isinstance(tasks, str):
+            tasks = tasks.split(", ")
         for task in tasks:
-            if task not in valid_tasks:
+            if task not in self._VALID_TASKS:
                 raise texc.InvalidEntry("Task")
 
     """
@@ -178,10 +289,10 @@ class ModelTester(ErsiliaBase):
         - Text
     """
 
-    def _check_model_input(self, data):
+    def _check_model_input(self, card):
         self.logger.debug("Checking model input...")
-        valid_inputs = [["Compound"], ["Protein"], ["Text"]]
-        if data["card"]["Input"] not in valid_inputs:
+        value = card["Input"]
+        if not isinstance(value, list) or tuple(value) not in self._VALID_INPUTS:
             raise texc.InvalidEntry("Input")
 
     """
@@ -193,16 +304,9 @@ class ModelTester(ErsiliaBase):
         - List of Lists
     """
 
-    def _check_model_input_shape(self, data):
+    def _check_model_input_shape(self, card):
         self.logger.debug("Checking model input shape...")
-        valid_input_shapes = [
-            "Single",
-            "Pair",
-            "List",
-            "Pair of Lists",
-            "List of Lists",
-        ]
-        if data["card"]["Input Shape"] not in valid_input_shapes:
+        if card["Input Shape"] not in self._VALID_INPUT_SHAPES:
             raise texc.InvalidEntry("Input Shape")
 
     """
@@ -220,29 +324,13 @@ class ModelTester(ErsiliaBase):
         - Text
     """
 
-    def _check_model_output(self, data):
+    def _check_model_output(self, card):
         self.logger.debug("Checking model output...")
-        valid_outputs = [
-            "Boolean",
-            "Compound",
-            "Descriptor",
-            "Distance",
-            "Experimental value",
-            "Image",
-            "Other value",
-            "Probability",
-            "Protein",
-            "Score",
-            "Text",
-        ]
-        sep = ", "
-        outputs = []
-        if sep in data["card"]["Output"]:
-            outputs = data["card"]["Output"].split(sep)
-        else:
-            outputs = data["card"]["Output"]
+        outputs = card["Output"]
+        if isinstance(outputs, str):
+            outputs = outputs.split(", ")
         for output in outputs:
-            if output not in valid_outputs:
+            if output not in self._VALID_OUTPUTS:
                 raise texc.InvalidEntry("Output")
 
     """
@@ -252,10 +340,10 @@ class ModelTester(ErsiliaBase):
         - Integer
     """
 
-    def _check_model_output_type(self, data):
+    def _check_model_output_type(self, card):
         self.logger.debug("Checking model output type...")
-        valid_output_types = [["String"], ["Float"], ["Integer"]]
-        if data["card"]["Output Type"] not in valid_output_types:
+        value = card["Output Type"]
+        if not isinstance(value, list) or tuple(value) not in self._VALID_OUTPUT_TYPES:
             raise texc.InvalidEntry("Output Type")
 
     """
@@ -267,16 +355,9 @@ class ModelTester(ErsiliaBase):
         - Serializable Object
     """
 
-    def _check_model_output_shape(self, data):
+    def _check_model_output_shape(self, card):
         self.logger.debug("Checking model output shape...")
-        valid_output_shapes = [
-            "Single",
-            "List",
-            "Flexible List",
-            "Matrix",
-            "Serializable Object",
-        ]
-        if data["card"]["Output Shape"] not in valid_output_shapes:
+        if card["Output Shape"] not in self._VALID_OUTPUT_SHAPES:
             raise texc.InvalidEntry("Output Shape")
 
     """
@@ -299,19 +380,16 @@ class ModelTester(ErsiliaBase):
             + "Beginning checks for {0} model information:".format(self.model_id)
             + RESET
         )
-        json_file = os.path.join(self._dest_dir, self.model_id, INFORMATION_FILE)
-        with open(json_file, "r") as f:
-            data = json.load(f)
-
-        self._check_model_id(data)
-        self._check_model_slug(data)
-        self._check_model_description(data)
-        self._check_model_task(data)
-        self._check_model_input(data)
-        self._check_model_input_shape(data)
-        self._check_model_output(data)
-        self._check_model_output_type(data)
-        self._check_model_output_shape(data)
+        card = self._card
+        self._check_model_id(card)
+        self._check_model_slug(card)
+        self._check_model_description(card)
+        self._check_model_task(card)
+        self._check_model_input(card)
+        self._check_model_input_shape(card)
+        self._check_model_output(card)
+        self._check_model_output_type(card)
+        self._check_model_output_shape(card)
         click.echo(BOLD + "Test: Model information, SUCCESS! ✅\n" + RESET)
 
         if output is not None:
@@ -324,12 +402,10 @@ class ModelTester(ErsiliaBase):
 
     @throw_ersilia_exception
     def check_single_input(self, output):
-        session = Session(config_json=None)
-        service_class = session.current_service_class()
         input = "COc1ccc2c(NC(=O)Nc3cccc(C(F)(F)F)n3)ccnc2c1"
 
         self.logger.debug(BOLD + "Testing model on single smiles input...\n" + RESET)
-        mdl = ErsiliaModel(self.model_id, service_class=service_class, config_json=None)
+        mdl = self._get_model()
         result = mdl.run(input=input, output=output, batch_size=100)
 
         if output is not None:
@@ -345,17 +421,14 @@ class ModelTester(ErsiliaBase):
 
     @throw_ersilia_exception
     def check_example_input(self, output):
-        session = Session(config_json=None)
-        service_class = session.current_service_class()
-        eg = ExampleGenerator(model_id=self.model_id)
-        input = eg.example(n_samples=NUM_SAMPLES, file_name=None, simple=True, try_predefined=False) 
+        input = self._get_example_input()
         self.logger.debug(
             BOLD
             + "\nTesting model on input of 5 smiles given by 'example' command...\n"
             + RESET
         )
         self.logger.debug("This is the input: {0}".format(input))
-        mdl = ErsiliaModel(self.model_id, service_class=service_class, config_json=None)
+        mdl = self._get_model()
         result = mdl.run(input=input, output=output, batch_size=100)
         if output is not None:
             self.example_input = True
@@ -363,6 +436,156 @@ class ModelTester(ErsiliaBase):
         else:
             self._print_output(result, output)
 
+    """
+    Comparators used by check_consistent_output. Each of them returns True if the two outputs are consistent:
+    - Numbers and lists of numbers are compared with the RMSE and the Spearman's correlation
+    - Strings and lists of strings are compared with the fuzz.ratio similarity
+    - Serializable objects are compared with the fuzz.ratio similarity of their JSON serialization
+    Matrices and ragged lists are flattened before being compared, and None values in numeric lists must
+    match position by position. Generative models are not expected to give the same text twice, so their
+    string and object outputs are not compared.
+    """
+
+    def _is_consistent_number(self, key, value1, value2):
+        rmse = _compute_rmse([value1], [value2])
+        self.logger.debug(f"RMSE for {key}: {rmse}")
+        if rmse > 0.1:  # Adjust the threshold as needed
+            self.logger.debug(
+                BOLD
+                + "\nBash run and Ersilia run produce inconsistent results (Root Mean Square Error difference exceeds 10%)."
+                + RESET
+            )
+            return False
+        rho, p_value = spearmanr([value1], [value2])
+        self.logger.debug(f"Spearman's correlation for {key}: {rho}")
+        if rho < 0.5:  # Adjust the threshold as needed
+            self.logger.debug(
+                BOLD
+                + "\nBash run and Ersilia run produce inconsistent results (Spearman's correlation below threshold)."
+                + RESET
+            )
+            return False
+        return True
+
+    def _is_consistent_number_list(self, key, ls1, ls2):
+        ls1 = [np.nan if x is None else x for x in _flatten(ls1)]
+        ls2 = [np.nan if x is None else x for x in _flatten(ls2)]
+        if len(ls1) != len(ls2):
+            self.logger.debug(f"Length mismatch for {key}: {len(ls1)} vs {len(ls2)}")
+            return False
+        ls1 = np.asarray(ls1, dtype=np.float64)
+        ls2 = np.asarray(ls2, dtype=np.float64)
+        missing = np.isnan(ls1)
+        if not np.array_equal(missing, np.isnan(ls2)):
+            self.logger.debug(f"Missing values for {key} differ between runs")
+            return False
+        ls1 = ls1[~missing]
+        ls2 = ls2[~missing]
+        if ls1.size == 0:
+            return True
+        rmse = _compute_rmse(ls1, ls2)
+        self.logger.debug(f"RMSE for {key}: {rmse}")
+        if rmse > 0.1:  # Adjust the threshold as needed
+            self.logger.debug(
+                BOLD
+                + "\nBash run and Ersilia run produce inconsistent results (Root Mean Square Error exceeded threshold of 10% for list)."
+                + RESET
+            )
+            return False
+        rho, p_value = spearmanr(ls1, ls2)
+        self.logger.debug(f"Spearman's correlation for {key}: {rho}")
+        if rho < 0.5:  # Adjust the threshold as needed
+            self.logger.debug(
+                BOLD
+                + "\nBash run and Ersilia run produce inconsistent results (Spearman's correlation below threshold for list)."
+                + RESET
+            )
+            return False
+        return True
+
+    def _is_consistent_string_list(self, key, ls1, ls2):
+        return (
+            self._compare_output_string_lists(list(_flatten(ls1)), list(_flatten(ls2)))
+            > 95
+        )
+
+    def _is_consistent_string(self, key, value1, value2):
+        return self._compare_output_strings(value1, value2) > 95
+
+    def _is_consistent_object(self, key, value1, value2):
+        return self._is_consistent_string(
+            key,
+            json.dumps(value1, sort_keys=True, default=str),
+            json.dumps(value2, sort_keys=True, default=str),
+        )
+
+    def _is_consistent_generative(self, key, value1, value2):
+        self.logger.debug(f"Skipping consistency check of generative output {key}")
+        return True
+
+    def _is_generative(self):
+        tasks = self._card.get("Task") or []
+        if isinstance(tasks, str):
+            tasks = tasks.split(", ")
+        return "Generative" in tasks
+
+    def _select_comparator(self, value):
+        if isinstance(value, (float, int)):
+            return self._is_consistent_number
+        if isinstance(value, list):
+            if not any(isinstance(x, str) for x in _flatten(value)):
+                return self._is_consistent_number_list
+            cmp = self._is_consistent_string_list
+        elif isinstance(value, dict):
+            cmp = self._is_consistent_object
+        else:
+            cmp = self._is_consistent_string
+        if self._is_generative():
+            return self._is_consistent_generative
+        return cmp
+
+    """
+    Compares the outputs of two runs, given as a list of (run 1 item, run 2 item) pairs. All the mismatches
+    are logged together and then a single InconsistentOutputTypes or InconsistentOutputs error is raised.
+    """
+
+    def _compare_outputs(self, zipped):
+        # Mismatches are collected as (sample index, key, value 1, value 2) and reported once at the end
+        type_mismatches = []
+        mismatches = []
+        # Output schemas are stable across samples, so the comparator of each key is chosen only once
+        cmp_for_key = {}
+
+        for idx, (item1, item2) in enumerate(zipped):
+            output1 = item1["output"]
+            output2 = item2["output"]
+
+            for key1, key2 in zip(output1.keys(), output2.keys()):
+                value1 = output1[key1]
+                value2 = output2[key2]
+                if not isinstance(value1, type(value2)):
+                    type_mismatches += [(idx, key1, value1, value2)]
+                    continue
+                if value1 is None:
+                    continue
+                cmp = cmp_for_key.get(key1)
+                if cmp is None:
+                    # Empty and all-None lists do not tell the type of their elements, so the comparator
+                    # is chosen from the other run and only cached once a typed value has been seen
+                    typed = value1 if _is_typed(value1) else value2
+                    cmp = self._select_comparator(typed)
+                    if _is_typed(typed):
+                        cmp_for_key[key1] = cmp
+                if not cmp(key1, value1, value2):
+                    mismatches += [(idx, key1, value1, value2)]
+
+        if type_mismatches or mismatches:
+            self.logger.debug("Mismatches (sample, key, output1 value, output2 value):")
+            self.logger.debug("\n".join(f"{m}" for m in type_mismatches + mismatches))
+            if type_mismatches:
+                raise texc.InconsistentOutputTypes(self.model_id)
+            raise texc.InconsistentOutputs(self.model_id)
+
     """
     Gets an example input of 5 smiles using the 'example' command, and then runs this same input on the 
     model twice. Then, it checks if the outputs are consistent or not and specifies that to the user. If 
@@ -377,99 +600,27 @@ class ModelTester(ErsiliaBase):
     
     @throw_ersilia_exception
     def check_consistent_output(self):
-        def compute_rmse(y_true, y_pred):
-            squared_errors = [(yt - yp) ** 2 for yt, yp in zip(y_true, y_pred)]
-            mse = sum(squared_errors) / len(squared_errors)
-            return mse
-
     
         self.logger.debug(BOLD + "\nConfirming model produces consistent output..." + RESET)
 
-        session = Session(config_json=None)
-        service_class = session.current_service_class()
+        service_class = self._get_service_class()
+        input = self._get_example_input()
 
-        eg = ExampleGenerator(model_id=self.model_id)
-        input = eg.example(n_samples=NUM_SAMPLES, file_name=None, simple=True, try_predefined=False)
-
-        mdl1 = ErsiliaModel(self.model_id, service_class=service_class, config_json=None)
+        # The two runs happen concurrently, so the second one needs its own instance
+        mdl1 = self._get_model()
         mdl2 = ErsiliaModel(self.model_id, service_class=service_class, config_json=None)
-        result = mdl1.run(input=input, output=None, batch_size=100)
-        result2 = mdl2.run(input=input, output=None, batch_size=100)
-
-        zipped = list(zip(result, result2))
-
-        for item1, item2 in zipped:
-            output1 = item1["output"]
-            output2 = item2["output"]
-
-            keys1 = list(output1.keys())
-            keys2 = list(output2.keys())
 
-            for key1, key2 in zip(keys1, keys2):
-                if not isinstance(output1[key1], type(output2[key2])):
-                    for item1, item2 in zipped:
-                        self.logger.debug(item1)
-                        self.logger.debug(item2)
-                        self.logger.debug("\n")
-                    raise texc.InconsistentOutputTypes(self.model_id)
+        def run_model(mdl):
+            # Results are generators, so consume them inside the worker thread
+            return list(mdl.run(input=input, output=None, batch_size=100))
 
-                if output1[key1] is None:
-                    continue
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            futures = [executor.submit(run_model, mdl) for mdl in (mdl1, mdl2)]
+            result, result2 = [f.result() for f in futures]
 
-                elif isinstance(output1[key1], (float, int)):
-                    # Calculate RMSE
-                    rmse = compute_rmse([output1[key1]], [output2[key2]])
-                    self.logger.debug(f"RMSE for {key1}: {rmse}")
-                    if rmse > 0.1:  # Adjust the threshold as needed
-                        self.logger.debug(
-                            BOLD
-                            + "\nBash run and Ersilia run produce inconsistent results (Root Mean Square Error difference exceeds 10%)."
-                            + RESET
-                        )
-                        raise texc.InconsistentOutputs(self.model_id)
-
-                    # Calculate Spearman's correlation
-                    rho, p_value = spearmanr([output1[key1]], [output2[key2]])
-                    self.logger.debug(f"Spearman's correlation for {key1}: {rho}")
-                    if rho < 0.5:  # Adjust the threshold as needed
-                        self.logger.debug(
-                            BOLD
-                            + "\nBash run and Ersilia run produce inconsistent results (Spearman's correlation below threshold)."
-                            + RESET
-                        )
-                        raise texc.InconsistentOutputs(self.model_id)
-
-                    elif isinstance(output1[key1], list):
-                        ls1 = output1[key1]
-                        ls2 = output2[key2]
-
-                        # Calculate rmse for lists
-                        rmse = compute_rmse(ls1, ls2)
-                        self.logger.debug(f"RMSE for {key1}: {rmse}")
-                        if rmse > 0.1:  # Adjust the threshold as needed
-                            self.logger.debug(
-                                BOLD
-                                + "\nBash run and Ersilia run produce inconsistent results (Root Mean Square Error exceeded threshold of 10% for list)."
-                                + RESET
-                            )
-                            raise texc.InconsistentOutputs(self.model_id)
+        zipped = list(zip(result, result2))
 
-                        # Calculate Spearman's correlation for lists
-                        rho, p_value = spearmanr(ls1, ls2)
-                        self.logger.debug(f"Spearman's correlation for {key1}: {rho}")
-                        if rho < 0.5:  # Adjust the threshold as needed
-                            self.logger.debug(
-                                BOLD
-                                + "\nBash run and Ersilia run produce inconsistent results (Spearman's correlation below threshold for list)."
-                                + RESET
-                            )
-                            raise texc.InconsistentOutputs(self.model_id)
-                    # Check String Outputs
-                    else: 
-                        if self._compare_output_strings(output1[key1], output2[key2]) <= 95:
-                            self.logger.debug(f"output1 value: {output1[key1]}")
-                            self.logger.debug(f"output2 value: {output2[key2]}")
-                            raise texc.InconsistentOutputs(self.model_id)
+        self._compare_outputs(zipped)
         self.consistent_output = True
         click.echo(
             BOLD + "Test: Output Consistency, SUCCESS! ✅\n" + RESET
@@ -517,7 +668,7 @@ class ModelTester(ErsiliaBase):
 
 
     def _compare_string_similarity(self, str1, str2, similarity_threshold):
-        similarity = fuzz.ratio(str1, str2)
+        similarity = round(fuzz.ratio(str1, str2))
         return similarity >= similarity_threshold
 
     
@@ -532,15 +683,13 @@ class ModelTester(ErsiliaBase):
         file_types = defaultdict(int)
         file_sizes = defaultdict(int)
         
-        for dirpath, dirnames, filenames in os.walk(directory):
-            for filename in filenames:
-                filepath = os.path.join(dirpath, filename)
-                if not os.path.islink(filepath):
-                    size = os.path.getsize(filepath)
-                    total_size += size
-                    file_extension = os.path.splitext(filename)[1]
-                    file_types[file_extension] += 1
-                    file_sizes[file_extension] += size
+        for entry in _scan_files(directory):
+            if not entry.is_symlink():
+                size = entry.stat(follow_symlinks=False).st_size
+                total_size += size
+                file_extension = os.path.splitext(entry.name)[1]
+                file_types[file_extension] += 1
+                file_sizes[file_extension] += size
         
         return total_size, file_types, file_sizes
 
@@ -556,14 +705,12 @@ class ModelTester(ErsiliaBase):
         file_types = defaultdict(int)
         file_sizes = defaultdict(int)
         
-        for dirpath, dirnames, filenames in os.walk(directory):
-            for filename in filenames:
-                filepath = os.path.join(dirpath, filename)
-                size = os.path.getsize(filepath)
-                total_size += size
-                file_extension = os.path.splitext(filename)[1]
-                file_types[file_extension] += 1
-                file_sizes[file_extension] += size
+        for entry in _scan_files(directory):
+            size = entry.stat().st_size
+            total_size += size
+            file_extension = os.path.splitext(entry.name)[1]
+            file_types[file_extension] += 1
+            file_sizes[file_extension] += size
         return total_size, file_types, file_sizes
         
     # Get location of conda environment
@@ -620,19 +767,27 @@ class ModelTester(ErsiliaBase):
     }
     
     
+    """
+    Logs a file line by line, so that large outputs are not loaded in memory at once.
+    """
+
+    def _log_file_content(self, file_path):
+        with open(file_path, "r") as f:
+            for line in f:
+                self.logger.debug(line.rstrip("\n"))
+
     @throw_ersilia_exception
     def run_bash(self):
         def updated_read_csv(self, file_path, ersilia_flag = False):
             data = []
             with open(file_path, "r") as file:
-                lines = file.readlines()
-                headers = lines[0].strip().split(",")
+                headers = next(file).strip().split(",")
                 if ersilia_flag:
                     headers = headers[2:]
                 
                 print("\n", "\n")
                 
-                for line in lines[1:]:
+                for line in file:
                     self.logger.debug(f"Processing line: {line}")
                     values = line.strip().split(",")
                     if ersilia_flag:
@@ -661,8 +816,7 @@ class ModelTester(ErsiliaBase):
             model_path =  os.path.join(EOS, "dest", self.model_id)
 
             # Create an example input
-            eg = ExampleGenerator(model_id=self.model_id)
-            input = eg.example(n_samples=NUM_SAMPLES, file_name=None, simple=True, try_predefined=False)
+            input = self._get_example_input()
             # Read it into a temp file
             ex_file = os.path.abspath(os.path.join(temp_dir, "example_file.csv"))
             
@@ -672,8 +826,7 @@ class ModelTester(ErsiliaBase):
                 for item in input:
                     f.write(str(item) + "\n")
 
-            run_sh_path = os.path.join(model_path, "model", "framework", "run.sh")
-            run_sh_path = os.path.join(model_path, "model", "framework", "run.sh")
+            run_sh_path = os.path.join(model_path, "model", "framework", RUN_FILE)
             # Halt this check if the run.sh file does not exist (e.g. eos3b5e)
             if not os.path.exists (run_sh_path):
                 self.logger.debug(
@@ -681,101 +834,80 @@ class ModelTester(ErsiliaBase):
                 )
                 return
 
-            # Navigate into the temporary directory
-           
+            # run.sh is executed from its own directory (cwd of the subprocess), without changing the process cwd
             subdirectory_path = os.path.join(model_path, "model", "framework")
-            self.logger.debug(f"Changing directory to: {subdirectory_path}")
-            os.chdir(subdirectory_path)
+            self.logger.debug(f"Running from directory: {subdirectory_path}")
             try:
                 run_path = os.path.abspath(subdirectory_path)
-                tmp_script = os.path.abspath(os.path.join(temp_dir, "script.sh"))
                 bash_output_path = os.path.abspath(os.path.join(temp_dir, "bash_output.csv"))
                 output_log = os.path.abspath(os.path.join(temp_dir, "output.txt"))
                 error_log = os.path.abspath(os.path.join(temp_dir, "error.txt"))
-                bash_script = """
-    source {0}/etc/profile.d/conda.sh       
-    conda activate {1}
-    cd {2}
-    bash run.sh . {3} {4} > {5} 2> {6}
-    conda deactivate
-    """.format(
-                    self.conda_prefix(self.is_base()),
+                # conda run executes run.sh inside the model environment without a wrapper script
+                # that sources conda.sh and activates/deactivates the environment
+                conda_exec = os.path.join(self.conda_prefix(self.is_base()), "bin", "conda")
+                cmd = [
+                    conda_exec,
+                    "run",
+                    "--no-capture-output",
+                    "-n",
                     self.model_id,
-                    run_path,
+                    "bash",
+                    RUN_FILE,
+                    ".",
                     ex_file,
                     bash_output_path,
-                    output_log,
-                    error_log,
-                )
-                self.logger.debug(f"Script path: {tmp_script}")
+                ]
+                self.logger.debug(f"Command: {' '.join(cmd)}")
                 self.logger.debug(f"bash output path: {bash_output_path}")
                 self.logger.debug(f"Output log path: {output_log}")
                 self.logger.debug(f"Error log path: {error_log}")
-                with open(tmp_script, "w") as f:
-                    f.write(bash_script)
 
                 self.logger.debug(BOLD + "\nExecuting 'bash run.sh'..." + RESET)
-                try:
-                    bash_result = subprocess.run(
-                        ["bash", tmp_script], capture_output=True, text=True, check=True
-                    )
-                except subprocess.CalledProcessError as e:
-                    self.logger.debug(f"STDOUT: {e.stdout}")
-                    raise RuntimeError("Error encountered while running the bash script.") from e
+                with open(output_log, "w") as out, open(error_log, "w") as err:
+                    bash_result = subprocess.run(cmd, cwd=run_path, stdout=out, stderr=err)
+                self.logger.debug(f"Return code: {bash_result.returncode}")
 
                 if os.path.exists(bash_output_path):
-                    with open(bash_output_path, "r") as bash_output_file:
-                        output_content = bash_output_file.read()
-                        self.logger.debug(BOLD + "\nBash execution completed!" + RESET)
-                        self.logger.debug("Captured Raw Bash Output:")
-                        self.logger.debug(output_content)
+                    self.logger.debug(BOLD + "\nBash execution completed!" + RESET)
+                    self.logger.debug("Captured Raw Bash Output:")
+                    self._log_file_content(bash_output_path)
                 else:
                     click.echo(BOLD + "\nWARNING: Bash output file not found when reading the path:"+RESET)
                     self.logger.debug(bash_output_path)
                     click.echo(BOLD + "\n Ersilia and Bash comparison will raise an error" + RESET)
-                    self.logger.debug(f"Generating bash script content for debugging: {tmp_script}\n")
              
                 with open(error_log, "r") as error_file:
                     error_content = error_file.read()
                     self.logger.debug(BOLD + "\nCaptured Error:" + RESET)
-                    if error_content == "":
+                    # With conda run, the return code is the one of run.sh itself
+                    if error_content == "" and bash_result.returncode == 0:
                         click.echo("No errors on bash run found 😄 ✅\n")
                         self.run_using_bash = True # bash run was successful
                     else:
                         self.logger.debug(error_content)
 
             except Exception as e:
-                raise RuntimeError(f"Error while activating the conda environment: {e}")
+                raise RuntimeError(f"Error while running {RUN_FILE} in the conda environment: {e}")
 
             self.logger.debug(BOLD + "\nExecuting ersilia run..."+RESET)
             ersilia_output_path = os.path.abspath(os.path.join(temp_dir, "ersilia_output.csv"))
             self.logger.debug(f"Ersilia output will be written to: {ersilia_output_path}")
 
-            session = Session(config_json=None)
-            service_class = session.current_service_class()
-            mdl = ErsiliaModel(
-                self.model_id, service_class=service_class, config_json=None
-            )
-            result = mdl.run(input=ex_file, output=ersilia_output_path, batch_size=100) 
+            mdl = self._get_model()
+            mdl.run(input=ex_file, output=ersilia_output_path, batch_size=100)
            
 
 
             if os.path.exists(ersilia_output_path):
-                with open(ersilia_output_path, "r") as ersilia_output_file:
-                    output_content = ersilia_output_file.read()
-                    click.echo("No errors on Ersilia run found 😄 ✅")
-                    self.logger.debug("Captured Raw Ersilia Output:")
-                    self.logger.debug(output_content)
+                click.echo("No errors on Ersilia run found 😄 ✅")
+                self.logger.debug("Captured Raw Ersilia Output:")
+                self._log_file_content(ersilia_output_path)
             else:
                 self.logger.debug(BOLD+f"Ersilia output file not found from the path: {ersilia_output_path}"+RESET)
             self.logger.debug("Processing ersilia csv output...")
             ersilia_run = updated_read_csv(self, ersilia_output_path, True)
 
 
-            with open(bash_output_path, "r") as bash_output_file:
-                    output_content = bash_output_file.read()
-                    self.logger.debug("Captured Raw Bash Output:")
-                    self.logger.debug(output_content)
             self.logger.debug("Processing raw bash output...: ")
             bash_run = updated_read_csv(self, bash_output_path, False)
             self.logger.debug(f"\nBash output:\n {bash_run}")
@@ -793,12 +925,7 @@ class ModelTester(ErsiliaBase):
             self.logger.debug(f"\n Bash columns:  {bash_columns}")
 
             common_columns = ersilia_columns & bash_columns
-            def compute_rmse(y_true, y_pred):
-                squared_errors = [(yt - yp) ** 2 for yt, yp in zip(y_true, y_pred)]
-                mse = sum(squared_errors) / len(squared_errors)
-                return mse
 
-            idx = 1
             self.logger.debug(BOLD + "\nComparing outputs from Ersilia and Bash runs..." + RESET)
             for column in common_columns:
                 for i in range(len(ersilia_run)):
@@ -807,7 +934,7 @@ class ModelTester(ErsiliaBase):
                     ):
                         values1 = [row[column] for row in ersilia_run]
                         values2 = [row[column] for row in bash_run]
-                        rmse = compute_rmse(values1, values2)
+                        rmse = _compute_rmse(values1, values2)
                         self.logger.debug(f"Root Mean Square Error for {column}: {rmse}")
                         if rmse > 0.10:  
                             self.logger.debug(
@@ -893,7 +1020,7 @@ class ModelTester(ErsiliaBase):
             "bash run without error": self.run_using_bash,
         }
         with open(output, "w") as json_file:
-            json.dump(data, json_file, indent=4)
+            _json_dump(data, json_file)
 
     def run(self, output_file):
         if MISSING_PACKAGES:
@@ -907,8 +1034,8 @@ class ModelTester(ErsiliaBase):
         self.check_example_input(output_file)
         self.check_consistent_output()
         self.get_directories_sizes()
-        self.get_directories_sizes()
-        self.run_bash()
+        if self._enable_bash_run:
+            self.run_bash()
         end = time.time()
         seconds_taken = end - start
         
@@ -179,11 +179,8 @@ class SimpleDocker(object):
         if self._with_udocker:
             raise Exception("Cannot built with udocker")
         path = os.path.abspath(path)
-        cwd = os.getcwd()
-        os.chdir(path)
         cmd = "docker build -t %s %s" % (self._image_name(org, img, tag), path)
         run_command(cmd)
-        os.chdir(cwd)
 
     def delete(self, org, img, tag):
         if not self._with_udocker:
@@ -250,6 +247,13 @@ class SimpleDocker(object):
         self.cp_from_container(name, img_path, local_path, org=org, img=img, tag=tag)
         self.remove(name)
 
+    def open_image(self, org, img, tag):
+        """
+        Returns a context manager that creates an idle container from the image on enter
+        and removes it on exit, so that several files can be copied with a single container.
+        """
+        return OpenedImage(self._image_name(org, img, tag), self.identifier.encode())
+
     @staticmethod
     def exec_container(name, cmd):
         cmd = 'docker exec -i %s bash -c "%s"' % (name, cmd)
@@ -322,6 +326,63 @@ class SimpleDocker(object):
             return None
 
 
+class OpenedImage(object):
+    """Idle (created but not started) container of an image, used to copy files from it."""
+
+    def __init__(self, image_name, name):
+        self.image_name = image_name
+        self.name = name
+
+    def __enter__(self):
+        cmd = "docker create --platform {0} --name {1} {2}".format(
+            resolve_platform(), self.name, self.image_name
+        )
+        run_command(cmd)
+        return self
+
+    def __exit__(self, exception_type, exception_value, traceback):
+        SimpleDocker.remove(self.name)
+
+    def copy(self, img_path, local_path):
+        """Copies a single file from the image. Returns True if the file was copied."""
+        local_path = os.path.abspath(local_path)
+        result = subprocess.run(
+            ["docker", "cp", "{0}:{1}".format(self.name, img_path), local_path],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            text=True,
+            env=os.environ,
+        )
+        if result.returncode != 0:
+            logger.debug(
+                "Could not copy {0} from image {1}: {2}".format(
+                    img_path, self.image_name, result.stderr.strip()
+                )
+            )
+            return False
+        return True
+
+    def copy_many(self, img_dir, files, local_dir):
+        """
+        Copy several files from a directory of the image, one docker cp per file.
+        :param img_dir: Directory inside the image containing the files.
+        :param files: List of (relative path in img_dir, local file name) pairs. When several
+            paths map to the same local file name, the first one found in the image wins.
+        :param local_dir: Local directory where the files will be written.
+        :return: List of local file names that were copied.
+        """
+        local_dir = os.path.abspath(local_dir)
+        os.makedirs(local_dir, exist_ok=True)
+        copied = []
+        for fr_file, to_file in files:
+            if to_file in copied:
+                continue
+            img_path = "{0}/{1}".format(img_dir.rstrip("/"), fr_file)
+            if self.copy(img_path, os.path.join(local_dir, to_file)):
+                copied += [to_file]
+        return copied
+
+
 class SimpleDockerfileParser(DockerfileParser):
     def __init__(self, path):
         if os.path.isdir(path):
@@ -0,0 +1,90 @@
+import os
+import sys
+import stat
+
+from ersilia.utils.docker import SimpleDocker
+
+MODEL_ID = "eos0t01"
+IMG_DIR = "/root/eos/dest/{0}".format(MODEL_ID)
+
+FAKE_DOCKER = """#!{python}
+import os
+import sys
+import shutil
+
+args = sys.argv[1:]
+with open(os.environ["FAKE_DOCKER_LOG"], "a") as f:
+    f.write(" ".join(args) + "\\n")
+if args[0] == "cp":
+    src = args[1].split(":", 1)[1]
+    src = os.path.join(os.environ["FAKE_DOCKER_ROOT"], src.lstrip("/"))
+    if not os.path.isfile(src):
+        sys.stderr.write("Error: Could not find the file {{0}} in container\\n".format(src))
+        sys.exit(1)
+    shutil.copyfile(src, args[2])
+"""
+
+
+def _fake_docker(tmp_path, monkeypatch, files):
+    root = tmp_path / "image"
+    for name, content in files.items():
+        path = root / IMG_DIR.lstrip("/") / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    docker = bin_dir / "docker"
+    docker.write_text(FAKE_DOCKER.format(python=sys.executable))
+    docker.chmod(docker.stat().st_mode | stat.S_IEXEC)
+    log = tmp_path / "docker.log"
+    monkeypatch.setenv("PATH", str(bin_dir) + os.pathsep + os.environ["PATH"])
+    monkeypatch.setenv("FAKE_DOCKER_ROOT", str(root))
+    monkeypatch.setenv("FAKE_DOCKER_LOG", str(log))
+    return log
+
+
+def _copy_many(tmp_path, files):
+    local_dir = tmp_path / "dest"
+    with SimpleDocker(use_udocker=False).open_image("ersiliaos", MODEL_ID, "latest") as img:
+        copied = img.copy_many(img_dir=IMG_DIR, files=files, local_dir=str(local_dir))
+    return copied, local_dir
+
+
+def test_copy_many_uses_single_container(tmp_path, monkeypatch):
+    log = _fake_docker(
+        tmp_path,
+        monkeypatch,
+        {"information.json": "{}", "api_schema.json": "{}", "model/checkpoints/big.pkl": "x"},
+    )
+    files = [("information.json", "information.json"), ("api_schema.json", "api_schema.json")]
+    copied, local_dir = _copy_many(tmp_path, files)
+    assert sorted(copied) == ["api_schema.json", "information.json"]
+    assert sorted(os.listdir(local_dir)) == ["api_schema.json", "information.json"]
+    calls = log.read_text().splitlines()
+    assert len([c for c in calls if c.startswith("create")]) == 1
+    assert len([c for c in calls if c.startswith("rm")]) == 1
+    # Only the requested files are copied, never the whole directory
+    assert all(c.split(" ")[1].endswith(".json") for c in calls if c.startswith("cp"))
+
+
+def test_copy_many_priority_and_missing_files(tmp_path, monkeypatch):
+    _fake_docker(
+        tmp_path,
+        monkeypatch,
+        {
+            "information.json": "{}",
+            "model/framework/input.csv": "second",
+            "model/framework/example.csv": "third",
+        },
+    )
+    files = [
+        ("information.json", "information.json"),
+        ("status.json", "status.json"),
+        ("model/framework/examples/input.csv", "input.csv"),
+        ("model/framework/input.csv", "input.csv"),
+        ("model/framework/example.csv", "input.csv"),
+    ]
+    copied, local_dir = _copy_many(tmp_path, files)
+    assert sorted(copied) == ["information.json", "input.csv"]
+    assert (local_dir / "input.csv").read_text() == "second"
+    assert not (local_dir / "status.json").exists()
@@ -0,0 +1,149 @@
+import pytest
+
+from ersilia import logger
+
+# ersilia.publish.test imports ersilia.cli, which imports it back through the test command
+import ersilia.cli  # noqa: F401
+from ersilia.publish.test import ModelTester
+from ersilia.utils.exceptions_utils import test_exceptions as texc
+
+MODEL_ID = "eos0t01"
+
+
+def _tester(task="Regression"):
+    tester = ModelTester.__new__(ModelTester)
+    tester.logger = logger
+    tester.model_id = MODEL_ID
+    tester._card = {"Identifier": MODEL_ID, "Task": [task]}
+    return tester
+
+
+def _is_consistent(tester, value1, value2):
+    cmp = tester._select_comparator(value1)
+    return cmp("key", value1, value2)
+
+
+def test_matrix_outputs():
+    tester = _tester()
+    matrix = [[0.1, 0.2, 0.3], [0.4, 0.5, 0.6]]
+    assert _is_consistent(tester, matrix, [[0.1, 0.2, 0.3], [0.4, 0.5, 0.6]])
+    assert not _is_consistent(tester, matrix, [[5.0, 4.0, 3.0], [2.0, 1.0, 0.0]])
+
+
+def test_ragged_outputs():
+    tester = _tester()
+    ragged = [[0.1, 0.2], [0.3], [0.4, 0.5, 0.6]]
+    assert _is_consistent(tester, ragged, [[0.1, 0.2], [0.3], [0.4, 0.5, 0.6]])
+    assert not _is_consistent(tester, ragged, [[0.1, 0.2], [0.3]])
+
+
+def test_numeric_list_with_missing_values():
+    tester = _tester()
+    assert _is_consistent(tester, [0.1, None, 0.3], [0.1, None, 0.3])
+    assert not _is_consistent(tester, [0.1, None, 0.3], [0.1, 0.2, 0.3])
+
+
+def test_string_matrix_outputs():
+    tester = _tester()
+    matrix = [["CCO", "CCN"], ["c1ccccc1"]]
+    assert _is_consistent(tester, matrix, [["CCO", "CCN"], ["c1ccccc1"]])
+    assert not _is_consistent(tester, matrix, [["CCO", "CCN"], ["CCCCCCCl"]])
+
+
+def test_serializable_object_outputs():
+    tester = _tester()
+    obj = {"smiles": "CCO", "scores": [0.1, 0.2]}
+    assert _is_consistent(tester, obj, {"scores": [0.1, 0.2], "smiles": "CCO"})
+    assert not _is_consistent(tester, obj, {"other": "c1ccccc1", "values": [9]})
+
+
+def test_generative_string_outputs():
+    tester = _tester(task="Generative")
+    assert _is_consistent(tester, "CCO", "c1ccccc1N")
+    assert _is_consistent(tester, ["CCO", "CCN"], ["c1ccccc1", "CCCl"])
+    # Numeric outputs of generative models are still compared
+    assert not _is_consistent(tester, [0.1, 0.2, 0.3], [3.0, 2.0, 1.0])
+
+
+def test_invalid_input_entries():
+    tester = _tester()
+    for value in (None, "Compound", 1, ["Number"]):
+        with pytest.raises(texc.InvalidEntry):
+            tester._check_model_input({"Input": value})
+    tester._check_model_input({"Input": ["Compound"]})
+
+
+def test_invalid_output_type_entries():
+    tester = _tester()
+    for value in (None, "Float", 1, ["Number"]):
+        with pytest.raises(texc.InvalidEntry):
+            tester._check_model_output_type({"Output Type": value})
+    tester._check_model_output_type({"Output Type": ["Float"]})
+
+
+def _pairs(outputs1, outputs2):
+    return [({"output": o1}, {"output": o2}) for o1, o2 in zip(outputs1, outputs2)]
+
+
+def test_select_comparator():
+    tester = _tester()
+    assert tester._select_comparator(0.5) == tester._is_consistent_number
+    assert tester._select_comparator(3) == tester._is_consistent_number
+    assert tester._select_comparator([0.1, 0.2]) == tester._is_consistent_number_list
+    assert tester._select_comparator(["CCO", "CCN"]) == tester._is_consistent_string_list
+    assert tester._select_comparator("CCO") == tester._is_consistent_string
+
+
+def test_compare_outputs_consistent():
+    tester = _tester()
+    outputs = [
+        {"score": 0.5, "values": [0.1, 0.2, 0.3], "tags": ["a", "b"], "smiles": "CCO"},
+        {"score": 0.7, "values": [0.4, 0.5, 0.6], "tags": ["c", "d"], "smiles": "CCN"},
+    ]
+    tester._compare_outputs(_pairs(outputs, outputs))
+
+
+def test_compare_outputs_skips_none():
+    tester = _tester()
+    outputs = [{"score": None, "smiles": None}, {"score": 0.5, "smiles": "CCO"}]
+    tester._compare_outputs(_pairs(outputs, outputs))
+
+
+def test_compare_outputs_type_mismatch():
+    tester = _tester()
+    with pytest.raises(texc.InconsistentOutputTypes):
+        tester._compare_outputs(
+            _pairs([{"score": 0.5, "smiles": "CCO"}], [{"score": "0.5", "smiles": "CCX"}])
+        )
+
+
+def test_compare_outputs_single_aggregated_raise(monkeypatch):
+    tester = _tester()
+    calls = []
+    comparator = tester._is_consistent_string
+
+    def counting_comparator(key, value1, value2):
+        calls.append(key)
+        return comparator(key, value1, value2)
+
+    monkeypatch.setattr(tester, "_is_consistent_string", counting_comparator)
+    outputs1 = [{"smiles": "CCCCCCCCO"}, {"smiles": "c1ccccc1"}, {"smiles": "CCN"}]
+    outputs2 = [{"smiles": "ClClClClCl"}, {"smiles": "c1ccccc1"}, {"smiles": "OOO"}]
+    with pytest.raises(texc.InconsistentOutputs):
+        tester._compare_outputs(_pairs(outputs1, outputs2))
+    # Every sample is compared before the error is raised
+    assert calls == ["smiles"] * 3
+
+
+def test_compare_outputs_untyped_lists():
+    outputs = [{"smiles": []}, {"smiles": ["CCO"]}, {"smiles": [None]}]
+    # Generative string outputs are skipped once the type of the list is known
+    _tester(task="Generative")._compare_outputs(_pairs(outputs, outputs))
+    tester = _tester()
+    tester._compare_outputs(_pairs(outputs, outputs))
+    with pytest.raises(texc.InconsistentOutputs):
+        tester._compare_outputs(
+            _pairs([{"smiles": []}, {"smiles": ["CCO"]}], [{"smiles": []}, {"smiles": ["ClCl"]}])
+        )
+    with pytest.raises(texc.InconsistentOutputs):
+        tester._compare_outputs(_pairs([{"smiles": [None]}], [{"smiles": ["CCO"]}]))